@@ -7,30 +7,173 @@ It focuses on robust BLE connection handling and command writes for manual actio
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
 import struct
-from typing import Optional
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Callable, Optional, Union
 
 from bleak import BleakClient, BleakScanner
 from bleak.backends.device import BLEDevice
-from bleak.exc import BleakDBusError
+from bleak.exc import BleakDBusError, BleakError
 from bleak_retry_connector import (
     BleakOutOfConnectionSlotsError,
     establish_connection,
 )
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import (
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential,
+)
 
+from homeassistant.components.bluetooth import async_ble_device_from_address
 from homeassistant.core import HomeAssistant
 
-from .const import CHARACTERISTIC_UUID, DEFAULT_BLUETOOTH_TIMEOUT
+from .const import (
+    CHARACTERISTIC_UUID,
+    CLIENT_IDLE_TIMEOUT,
+    DEFAULT_BLUETOOTH_TIMEOUT,
+    DEFAULT_SCAN_TIMEOUT,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# Precompiled frame layouts: each command is packed together with the trailing
+# commit frame in a single call (avoids re-parsing the format string and a
+# separate pack + concat per command).
+_FRAME5 = struct.Struct(">HBBBHBB")
+_FRAME6 = struct.Struct(">HBBBBHBB")
+_COMMIT = struct.Struct(">BB")
+_COMMIT_FIELDS = (0x3B, 0x00)
+
+# Commands with fully constant arguments are packed once at import time
+_CMD_TURN_ON = _FRAME5.pack(0x3105, 0x12, 0xFF, 0x00, 0xFFFF, *_COMMIT_FIELDS)
+_CMD_TURN_OFF_PERM = _FRAME5.pack(0x3105, 0xC0, 0x00, 0x00, 0x0000, *_COMMIT_FIELDS)
+_CMD_STOP = _FRAME5.pack(0x3105, 0x24, 0x00, 0x00, 0xFFFF, *_COMMIT_FIELDS)
+_COMMIT_FRAME = _COMMIT.pack(*_COMMIT_FIELDS)
+
+# Command table: constant commands map to their pre-packed frame, parameterized
+# ones to (layout, builder) where the builder turns the call arguments into the
+# command field tuple (the commit fields are appended when packing).
+_OPS: dict[str, Union[bytes, tuple[struct.Struct, Callable[..., tuple[int, ...]]]]] = {
+    "turn_on": _CMD_TURN_ON,
+    "turn_off_permanent": _CMD_TURN_OFF_PERM,
+    "turn_off_x_days": (_FRAME5, lambda days: (0x3105, 0x15, 0x00, days, 0xFFFF)),
+    "sprinkle_station": (
+        _FRAME6,
+        lambda station, minutes: (0x3105, 0x22, station, 0x00, minutes, 0xFFFF),
+    ),
+    "sprinkle_all": (_FRAME5, lambda minutes: (0x3105, 0x23, 0x00, minutes, 0xFFFF)),
+    "run_program": (_FRAME5, lambda program: (0x3105, 0x21, program, 0x00, 0xFFFF)),
+    "stop_manual_sprinkle": _CMD_STOP,
+}
+
 
 class APIConnectionError(Exception):
     """Exception raised when a BLE connection or write fails."""
 
 
+# D-Bus errors BlueZ reports when the device rejects the written value itself
+# (ATT "Invalid Attribute Value Length" / "Request Not Supported"), as opposed
+# to a link problem.
+_UNSUPPORTED_WRITE_ERRORS = frozenset(
+    {"org.bluez.Error.InvalidValueLength", "org.bluez.Error.NotSupported"}
+)
+
+
+def _is_unsupported_write(exc: BaseException) -> bool:
+    """Return True if `exc` means the device does not accept this write."""
+    return isinstance(exc, BleakDBusError) and exc.dbus_error in _UNSUPPORTED_WRITE_ERRORS
+
+
+def _is_retryable_write_error(exc: BaseException) -> bool:
+    """Return True for transient write errors worth another attempt."""
+    return isinstance(exc, (BleakError, OSError)) and not _is_unsupported_write(exc)
+
+
+async def _safe_disconnect(client: BleakClient) -> None:
+    """Disconnect `client`, ignoring errors (the link may already be gone)."""
+    try:
+        await client.disconnect()
+    except Exception:  # noqa: BLE001
+        pass
+
+
+# Background disconnects of one-shot connections, keyed by lowercased MAC, so the
+# next connect to that device waits until the old link is torn down (on BlueZ a
+# late disconnect would otherwise hit the new connection).
+_PENDING_DISCONNECTS: dict[str, asyncio.Task] = {}
+
+
+def _forget_pending_disconnect(key: str, task: asyncio.Task) -> None:
+    if _PENDING_DISCONNECTS.get(key) is task:
+        del _PENDING_DISCONNECTS[key]
+
+
+class _PersistentClient:
+    """Long-lived BLE connection shared by every command sent to one device.
+
+    The connection is dropped after CLIENT_IDLE_TIMEOUT seconds without activity
+    or when the device disconnects on its own; the next command reconnects.
+    """
+
+    def __init__(self, hass: HomeAssistant, lock: Optional[asyncio.Lock] = None) -> None:
+        self.hass = hass
+        self.client: Optional[BleakClient] = None
+        # Serializes connect + write for the device
+        self.lock = lock or asyncio.Lock()
+        self._idle_handle: Optional[asyncio.TimerHandle] = None
+        self._disconnect_task: Optional[asyncio.Task] = None
+
+    def schedule_disconnect(self, client: BleakClient) -> None:
+        """Disconnect `client` in the background without making the caller wait."""
+        self._disconnect_task = self.hass.async_create_background_task(
+            _safe_disconnect(client), "solem_disconnect"
+        )
+
+    async def async_wait_disconnected(self) -> None:
+        """Wait for a pending background disconnect, if any."""
+        task, self._disconnect_task = self._disconnect_task, None
+        if task is not None:
+            await task
+
+    def touch(self) -> None:
+        """(Re)arm the idle-disconnect timer."""
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+        self._idle_handle = self.hass.loop.call_later(CLIENT_IDLE_TIMEOUT, self._on_idle)
+
+    def on_disconnect(self, _client: BleakClient) -> None:
+        """Forget the cached client once the link is gone."""
+        if self.client is not None and not self.client.is_connected:
+            self.client = None
+            if self._idle_handle is not None:
+                self._idle_handle.cancel()
+                self._idle_handle = None
+
+    def _on_idle(self) -> None:
+        self._idle_handle = None
+        if self.lock.locked():
+            # A command is in flight; it re-arms the timer when it finishes.
+            return
+        client, self.client = self.client, None
+        if client is not None:
+            self.schedule_disconnect(client)
+
+    async def async_close(self) -> None:
+        """Cancel the idle timer and disconnect (used on Home Assistant shutdown)."""
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        async with self.lock:
+            await self.async_wait_disconnected()
+            client, self.client = self.client, None
+            if client is not None:
+                await _safe_disconnect(client)
+
+
 class SolemAPI:
     """API wrapper for the Solem BLE protocol."""
 
@@ -39,75 +182,172 @@ class SolemAPI:
         hass: HomeAssistant,
         mac_address: str,
         bluetooth_timeout: int = DEFAULT_BLUETOOTH_TIMEOUT,
+        locks: Optional[dict[str, asyncio.Lock]] = None,
+        scan_timeout: float = DEFAULT_SCAN_TIMEOUT,
+        coalesce_commit: bool = False,
+        clients: Optional[dict[str, _PersistentClient]] = None,
     ) -> None:
         self.hass = hass
         self.mac_address = mac_address
+        self._mac_lower = mac_address.lower()
         self.bluetooth_timeout = bluetooth_timeout
+        self.scan_timeout = scan_timeout
 
         self.characteristic_uuid: str = CHARACTERISTIC_UUID
+        # Per-device locks keyed by lowercased MAC, shared between instances so
+        # parallel calls for the same device serialize onto one connection attempt.
+        # With a shared connection this is the holder's lock; otherwise it guards
+        # the one-shot connect (falling back to a per-instance lock).
+        self._locks = locks
         self._conn_lock = asyncio.Lock()
+        # Shared connection holders keyed by lowercased MAC; without it every
+        # command connects and disconnects on its own.
+        self._clients = clients
+        # Opt-in: send command + commit in a single GATT write. Not yet confirmed
+        # on Solem hardware; turned off if the device rejects the frame length.
+        self._coalesce_commit = coalesce_commit
+        # Reusable buffer for parameterized frames (command followed by commit);
+        # guarded so concurrent commands on this instance don't overwrite a
+        # pending frame.
+        self._buf = bytearray(16)
+        self._buf_lock = asyncio.Lock()
 
     async def scan_bluetooth(self) -> list[BLEDevice]:
         """Return a list of discovered BLE devices."""
-        return await BleakScanner.discover(timeout=5.0)
+        return await BleakScanner.discover(timeout=self.scan_timeout)
+
+    def _ha_ble_device(self) -> Optional[BLEDevice]:
+        """Look the device up in Home Assistant's shared bluetooth scanner."""
+        return async_ble_device_from_address(self.hass, self.mac_address, connectable=True)
 
     async def _resolve_ble_device(self) -> BLEDevice:
         """Resolve a BLEDevice for the configured MAC address."""
-        # First attempt: direct lookup by address (fast-path on most platforms)
-        ble_device: Optional[BLEDevice] = await BleakScanner.find_device_by_address(
-            self.mac_address, timeout=5.0
+        # Preferred: Home Assistant's shared scanner already knows the device, so
+        # no scan is needed here.
+        ble_device: Optional[BLEDevice] = self._ha_ble_device()
+        if ble_device is not None:
+            return ble_device
+
+        # Not seen yet: wait for an advertisement by address
+        ble_device = await BleakScanner.find_device_by_address(
+            self.mac_address, timeout=self.scan_timeout
         )
         if ble_device is not None:
             return ble_device
 
         # Fallback: full scan and manual match (some platforms/proxies behave like this)
-        devices = await BleakScanner.discover(timeout=5.0)
+        devices = await BleakScanner.discover(timeout=self.scan_timeout)
         for d in devices:
-            if (d.address or "").lower() == self.mac_address.lower():
+            if (d.address or "").lower() == self._mac_lower:
                 return d
 
         raise APIConnectionError("Device not found! Failed connecting!")
 
-    async def _connect_client(self) -> BleakClient:
+    def _latest_ble_device(self, fallback: BLEDevice) -> BLEDevice:
+        """Return Home Assistant's freshest BLEDevice for this address.
+
+        Called by bleak-retry-connector between attempts so a retry can move to
+        another adapter or proxy with free connection slots.
+        """
+        return self._ha_ble_device() or fallback
+
+    async def _connect_client(self, disconnected_callback=None) -> BleakClient:
         """Establish a robust connection using bleak-retry-connector."""
-        async with self._conn_lock:
-            ble_device = await self._resolve_ble_device()
+        ble_device = await self._resolve_ble_device()
+        try:
+            client = await establish_connection(
+                BleakClient,
+                ble_device,
+                name=f"Solem - {self.mac_address}",
+                disconnected_callback=disconnected_callback,
+                ble_device_callback=lambda: self._latest_ble_device(ble_device),
+                # Already the bleak-retry-connector default; pinned so reconnects
+                # keep reusing the cached GATT services if that default changes.
+                use_services_cache=True,
+                timeout=self.bluetooth_timeout,
+                max_attempts=3,
+            )
+            return client
+        except BleakOutOfConnectionSlotsError as exc:
+            raise APIConnectionError(
+                "Bluetooth adapter/proxy out of connection slots or device busy/unreachable"
+            ) from exc
+        except (BleakDBusError, TimeoutError, OSError) as exc:
+            raise APIConnectionError("Timeout connecting to device") from exc
+        except Exception as exc:  # noqa: BLE001
+            raise APIConnectionError("Unexpected BLE connection error") from exc
+
+    def _persistent_client(self) -> Optional[_PersistentClient]:
+        """Return the shared connection holder for this device, if a registry was given."""
+        clients = self._clients
+        if clients is None:
+            return None
+        entry = clients.get(self._mac_lower)
+        if entry is None:
+            lock = None if self._locks is None else self._locks[self._mac_lower]
+            entry = clients[self._mac_lower] = _PersistentClient(self.hass, lock)
+        return entry
+
+    @asynccontextmanager
+    async def _client_session(self) -> AsyncIterator[BleakClient]:
+        """Yield a connected client.
+
+        Reuses the shared per-device connection when available, otherwise connects
+        for this call only and disconnects afterwards.
+        """
+        entry = self._persistent_client()
+        if entry is None:
+            lock = self._conn_lock if self._locks is None else self._locks[self._mac_lower]
+            # Held for the whole session so parallel calls for the device run one
+            # after another, and the disconnect is recorded before the next one
+            # can connect.
+            async with lock:
+                pending = _PENDING_DISCONNECTS.pop(self._mac_lower, None)
+                if pending is not None:
+                    await pending
+                client = await self._connect_client()
+                try:
+                    yield client
+                finally:
+                    # Let the OS tear the link down without making the caller wait.
+                    task = self.hass.async_create_background_task(
+                        _safe_disconnect(client), "solem_disconnect"
+                    )
+                    _PENDING_DISCONNECTS[self._mac_lower] = task
+                    task.add_done_callback(
+                        functools.partial(_forget_pending_disconnect, self._mac_lower)
+                    )
+            return
+
+        async with entry.lock:
+            client = entry.client
+            if client is None or not client.is_connected:
+                # Already serialized per device by entry.lock
+                await entry.async_wait_disconnected()
+                client = await self._connect_client(entry.on_disconnect)
+                entry.client = client
             try:
-                client = await establish_connection(
-                    BleakClient,
-                    ble_device,
-                    name=f"Solem - {self.mac_address}",
-                    timeout=self.bluetooth_timeout,
-                    max_attempts=3,
-                )
-                return client
-            except BleakOutOfConnectionSlotsError as exc:
-                raise APIConnectionError(
-                    "Bluetooth adapter/proxy out of connection slots or device busy/unreachable"
-                ) from exc
-            except (BleakDBusError, TimeoutError, OSError) as exc:
-                raise APIConnectionError("Timeout connecting to device") from exc
-            except Exception as exc:  # noqa: BLE001
-                raise APIConnectionError("Unexpected BLE connection error") from exc
+                yield client
+            except Exception:
+                # Don't keep a link around that just failed us.
+                entry.client = None
+                entry.schedule_disconnect(client)
+                raise
+            finally:
+                entry.touch()
 
     async def list_characteristics(self) -> dict:
         """Return discovered services/characteristics (debug helper)."""
-        client = await self._connect_client()
-        try:
-            if not client.is_connected:
-                raise APIConnectionError("Failed connecting!")
-
+        async with self._client_session() as client:
             # Home Assistant wraps BleakClient (HaBleakClientWrapper) and does not
             # expose BleakClient.get_services(). After connecting, discovered
             # services are available via the `services` attribute.
-            services = getattr(client, "services", None)
-            if services is None:
-                # Last-resort fallback for non-HA clients / unexpected wrappers.
-                inner = getattr(client, "_client", None) or getattr(client, "_bleak_client", None)
-                if inner is not None and hasattr(inner, "get_services"):
-                    services = await inner.get_services()
-                else:
-                    raise APIConnectionError("Services not available on this platform/client")
+            try:
+                services = client.services
+            except BleakError as exc:
+                raise APIConnectionError(
+                    "Services not available on this platform/client"
+                ) from exc
             result: dict = {}
             for svc in services:
                 chars = []
@@ -121,72 +361,116 @@ class SolemAPI:
                     )
                 result[str(svc.uuid)] = chars
             return result
-        finally:
-            try:
-                await client.disconnect()
-            except Exception:  # noqa: BLE001
-                pass
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=0.4, min=0.4, max=2))
-    async def _write_with_auth_retry(self, client: BleakClient, payload: bytes) -> None:
+    @retry(
+        retry=retry_if_exception(_is_retryable_write_error),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=0.05, min=0.05, max=0.4),
+        reraise=True,
+    )
+    async def _write_with_auth_retry(
+        self,
+        client: BleakClient,
+        payload: Union[bytes, memoryview],
+        response: bool = False,
+    ) -> None:
         """Write with a small retry loop (Solem can be picky right after connect)."""
         if not client.is_connected:
             raise APIConnectionError("Client not connected")
 
-        await client.write_gatt_char(self.characteristic_uuid, payload, response=False)
+        await client.write_gatt_char(self.characteristic_uuid, payload, response=response)
 
-    async def _write_and_commit(self, command: bytes) -> None:
-        """Write a command then commit it (Solem protocol)."""
-        client = await self._connect_client()
+    def _write_modes(self, client: BleakClient) -> tuple[bool, bool]:
+        """Return the `response` flags for the (command, commit) writes.
+
+        The command is written with response when the characteristic supports it,
+        so a dropped packet fails fast instead of waiting for a timeout. The commit
+        stays write-without-response unless the characteristic only supports writes
+        with response. Unknown characteristics keep the write-without-response default.
+        """
         try:
-            if not client.is_connected:
-                raise APIConnectionError("Failed connecting!")
-            await self._write_with_auth_retry(client, command)
-            # Commit frame
-            commit = struct.pack(">BB", 0x3B, 0x00)
-            await self._write_with_auth_retry(client, commit)
-        finally:
+            char = client.services.get_characteristic(self.characteristic_uuid)
+        except BleakError:
+            char = None
+        if char is None:
+            return False, False
+        props = char.properties
+        command_response = "write" in props
+        commit_response = command_response and "write-without-response" not in props
+        return command_response, commit_response
+
+    async def _write_and_commit(self, frame: Union[bytes, memoryview], size: int) -> None:
+        """Write a command then commit it (Solem protocol).
+
+        `frame` holds the `size`-byte command immediately followed by the commit frame.
+        """
+        async with self._client_session() as client:
+            command_response, commit_response = self._write_modes(client)
             try:
-                await client.disconnect()
-            except Exception:  # noqa: BLE001
-                pass
+                if self._coalesce_commit:
+                    try:
+                        await self._write_with_auth_retry(
+                            client, frame, response=command_response
+                        )
+                        return
+                    except BleakDBusError as exc:
+                        if not _is_unsupported_write(exc):
+                            raise
+                        _LOGGER.debug(
+                            "%s rejected command + commit in one write, sending separately: %s",
+                            self.mac_address,
+                            exc,
+                        )
+                        self._coalesce_commit = False
+                await self._write_with_auth_retry(
+                    client, frame[:size], response=command_response
+                )
+                # Commit frame
+                await self._write_with_auth_retry(
+                    client, _COMMIT_FRAME, response=commit_response
+                )
+            except (BleakError, OSError) as exc:
+                raise APIConnectionError("Failed writing to device") from exc
+
+    async def _send(self, op: str, *args: int) -> None:
+        """Pack the frame for `op` from the command table and write it."""
+        frame = _OPS[op]
+        if isinstance(frame, bytes):
+            await self._write_and_commit(frame, len(frame) - _COMMIT.size)
+            return
+        layout, build = frame
+        async with self._buf_lock:
+            layout.pack_into(self._buf, 0, *build(*args), *_COMMIT_FIELDS)
+            await self._write_and_commit(
+                memoryview(self._buf)[: layout.size], layout.size - _COMMIT.size
+            )
 
     async def turn_on(self) -> None:
         """Turn on controller (enable watering)."""
-        command = struct.pack(">HBBBH", 0x3105, 0x12, 0xFF, 0x00, 0xFFFF)
-        await self._write_and_commit(command)
+        await self._send("turn_on")
 
     async def turn_off_permanent(self) -> None:
         """Disable watering permanently."""
-        command = struct.pack(">HBBBH", 0x3105, 0xC0, 0x00, 0x00, 0x0000)
-        await self._write_and_commit(command)
+        await self._send("turn_off_permanent")
 
     async def turn_off_x_days(self, days: int) -> None:
         """Disable watering for X days."""
-        days = max(0, min(days, 365))
-        command = struct.pack(">HBBBH", 0x3105, 0x15, 0x00, days, 0xFFFF)
-        await self._write_and_commit(command)
+        await self._send("turn_off_x_days", max(0, min(days, 365)))
 
     async def sprinkle_station_x_for_y_minutes(self, station: int, minutes: int) -> None:
         """Manually water a station for Y minutes."""
-        station = max(1, min(station, 16))
-        minutes = max(1, min(minutes, 240))
-        command = struct.pack(">HBBBBH", 0x3105, 0x22, station, 0x00, minutes, 0xFFFF)
-        await self._write_and_commit(command)
+        await self._send(
+            "sprinkle_station", max(1, min(station, 16)), max(1, min(minutes, 240))
+        )
 
     async def sprinkle_all_stations_for_y_minutes(self, minutes: int) -> None:
         """Manually water all stations for Y minutes each."""
-        minutes = max(1, min(minutes, 240))
-        command = struct.pack(">HBBBH", 0x3105, 0x23, 0x00, minutes, 0xFFFF)
-        await self._write_and_commit(command)
+        await self._send("sprinkle_all", max(1, min(minutes, 240)))
 
     async def run_program_x(self, program: int) -> None:
         """Run a controller program by id (1-3 on most devices)."""
-        program = max(1, min(program, 3))
-        command = struct.pack(">HBBBH", 0x3105, 0x21, program, 0x00, 0xFFFF)
-        await self._write_and_commit(command)
+        await self._send("run_program", max(1, min(program, 3)))
 
     async def stop_manual_sprinkle(self) -> None:
         """Stop any running manual watering session."""
-        command = struct.pack(">HBBBH", 0x3105, 0x24, 0x00, 0x00, 0xFFFF)
-        await self._write_and_commit(command)
+        await self._send("stop_manual_sprinkle")
@@ -6,16 +6,67 @@ without re-implementing scanning logic.
 
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+import time
+from typing import Any, Optional
 
 from homeassistant.core import HomeAssistant
 
+from .const import DEFAULT_SCAN_TIMEOUT
 
-async def async_scan_devices(hass: HomeAssistant, timeout: int = 5) -> list[Any]:
+# Result of the last active scan as (monotonic timestamp, devices), and the scan
+# currently in flight so concurrent callers share it.
+_last_scan: Optional[tuple[float, list[Any]]] = None
+_scan_task: Optional[asyncio.Future] = None
+# Lazily created scanner reused for every fallback scan, so we don't register a
+# new scanner object with the OS bluetooth stack on each call.
+_scanner: Optional[Any] = None
+
+
+async def _async_run_scan(timeout: float) -> list[Any]:
+    """Scan with the shared scanner for `timeout` seconds."""
+    global _scanner
+
+    if _scanner is None:
+        from bleak import BleakScanner
+
+        _scanner = BleakScanner()
+    await _scanner.start()
+    try:
+        await asyncio.sleep(timeout)
+    finally:
+        await _scanner.stop()
+    return list(_scanner.discovered_devices)
+
+
+async def _async_active_scan(timeout: float) -> list[Any]:
+    """Run an active bleak scan, reusing results younger than `timeout` seconds."""
+    global _last_scan, _scan_task
+
+    if _last_scan is not None and time.monotonic() - _last_scan[0] < timeout:
+        return _last_scan[1]
+
+    task = _scan_task
+    if task is None:
+        task = _scan_task = asyncio.ensure_future(_async_run_scan(timeout))
+    try:
+        devices = await asyncio.shield(task)
+    finally:
+        if _scan_task is task and task.done():
+            _scan_task = None
+
+    _last_scan = (time.monotonic(), devices)
+    return devices
+
+
+async def async_scan_devices(
+    hass: HomeAssistant, timeout: float = DEFAULT_SCAN_TIMEOUT
+) -> list[Any]:
     """Return a list of discovered BLE devices.
 
     Prefer Home Assistant's bluetooth discovery when available. Fall back to a direct
-    scan via bleak if bluetooth discovery is unavailable.
+    scan via bleak if bluetooth discovery is unavailable; results of that scan are
+    cached for `timeout` seconds.
 
     The returned objects typically expose `.name` and `.address` attributes.
     """
@@ -27,6 +78,4 @@ async def async_scan_devices(hass: HomeAssistant, timeout: int = 5) -> list[Any]
         return async_discovered_devices(hass)
     except Exception:
         # Fallback to an active scan.
-        from bleak import BleakScanner
-
-        return await BleakScanner.discover(timeout=timeout)
+        return await _async_active_scan(timeout)
@@ -8,3 +8,10 @@ CHARACTERISTIC_UUID = "108b0002-eab5-bc09-d0ea-0b8f467ce8ee"
 # Default Bluetooth connection timeout (seconds)
 DEFAULT_BLUETOOTH_TIMEOUT = 15
 MIN_BLUETOOTH_TIMEOUT = 5
+
+# Default BLE discovery timeout (seconds) when falling back to a bleak scan
+DEFAULT_SCAN_TIMEOUT = 2.0
+MIN_SCAN_TIMEOUT = 0.5
+
+# Seconds a shared BLE connection is kept open after the last command
+CLIENT_IDLE_TIMEOUT = 30
@@ -2,16 +2,30 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
 import logging
+import re
+from collections import defaultdict
 
-from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, ServiceCall
 from homeassistant.exceptions import HomeAssistantError
 
 from .api import APIConnectionError, SolemAPI
-from .const import DEFAULT_BLUETOOTH_TIMEOUT, DOMAIN, MIN_BLUETOOTH_TIMEOUT
+from .const import (
+    DEFAULT_BLUETOOTH_TIMEOUT,
+    DEFAULT_SCAN_TIMEOUT,
+    DOMAIN,
+    MIN_BLUETOOTH_TIMEOUT,
+    MIN_SCAN_TIMEOUT,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# Normalized device MAC: six uppercase hex octets separated by colons
+_MAC_RE = re.compile(r"[0-9A-F]{2}(?::[0-9A-F]{2}){5}")
+
 
 def _get_timeout(call: ServiceCall) -> int:
     timeout = call.data.get("bluetooth_timeout", DEFAULT_BLUETOOTH_TIMEOUT)
@@ -22,23 +36,65 @@ def _get_timeout(call: ServiceCall) -> int:
     return max(MIN_BLUETOOTH_TIMEOUT, timeout_int)
 
 
+def _get_scan_timeout(call: ServiceCall) -> float:
+    timeout = call.data.get("scan_timeout", DEFAULT_SCAN_TIMEOUT)
+    try:
+        timeout_float = float(timeout)
+    except (TypeError, ValueError) as exc:
+        raise HomeAssistantError("Invalid scan_timeout") from exc
+    return max(MIN_SCAN_TIMEOUT, timeout_float)
+
+
+def _normalize_mac(mac: str) -> str:
+    """Return `mac` uppercased and colon-separated, rejecting anything else."""
+    if not isinstance(mac, str):
+        raise HomeAssistantError("Invalid device_mac")
+    normalized = mac.strip().upper().replace("-", ":")
+    if not _MAC_RE.fullmatch(normalized):
+        raise HomeAssistantError(f"Invalid device_mac: {mac}")
+    return normalized
+
+
+def _get_api(hass: HomeAssistant, mac: str, timeout: int, scan_timeout: float) -> SolemAPI:
+    """Return the cached SolemAPI for these settings, creating it on first use."""
+    mac = _normalize_mac(mac)
+    key = (mac, timeout, scan_timeout)
+    data = hass.data[DOMAIN]
+    apis: dict[tuple[str, int, float], SolemAPI] = data["apis"]
+    api = apis.get(key)
+    if api is None:
+        api = apis[key] = SolemAPI(
+            hass,
+            mac,
+            bluetooth_timeout=timeout,
+            locks=data["locks"],
+            scan_timeout=scan_timeout,
+            clients=data["clients"],
+        )
+    return api
+
+
 async def async_list_characteristics(hass: HomeAssistant, call: ServiceCall) -> None:
     device_mac = call.data.get("device_mac")
-    api = SolemAPI(hass, device_mac, bluetooth_timeout=_get_timeout(call))
+    api = _get_api(hass, device_mac, _get_timeout(call), _get_scan_timeout(call))
     try:
         result = await api.list_characteristics()
-        # Log output so the user can read it from HA logs.
+        # Log output so the user can read it from HA logs (one record for the
+        # whole listing rather than one per line).
+        lines = []
         for svc_uuid, chars in result.items():
-            _LOGGER.info("Service: %s", svc_uuid)
-            for c in chars:
-                _LOGGER.info("  Characteristic: %s (properties=%s)", c["uuid"], c["properties"])
+            lines.append(f"Service: {svc_uuid}")
+            lines.extend(
+                f"  Characteristic: {c['uuid']} (properties={c['properties']})" for c in chars
+            )
+        _LOGGER.info("Characteristics for %s:\n%s", api.mac_address, "\n".join(lines))
     except APIConnectionError as exc:
         raise HomeAssistantError(str(exc)) from exc
 
 
 async def async_turn_off_permanent(hass: HomeAssistant, call: ServiceCall) -> None:
     device_mac = call.data.get("device_mac")
-    api = SolemAPI(hass, device_mac, bluetooth_timeout=_get_timeout(call))
+    api = _get_api(hass, device_mac, _get_timeout(call), _get_scan_timeout(call))
     try:
         await api.turn_off_permanent()
     except APIConnectionError as exc:
@@ -48,7 +104,7 @@ async def async_turn_off_permanent(hass: HomeAssistant, call: ServiceCall) -> No
 async def async_turn_off_x_days(hass: HomeAssistant, call: ServiceCall) -> None:
     device_mac = call.data.get("device_mac")
     days = int(call.data.get("days", 1))
-    api = SolemAPI(hass, device_mac, bluetooth_timeout=_get_timeout(call))
+    api = _get_api(hass, device_mac, _get_timeout(call), _get_scan_timeout(call))
     try:
         await api.turn_off_x_days(days)
     except APIConnectionError as exc:
@@ -57,7 +113,7 @@ async def async_turn_off_x_days(hass: HomeAssistant, call: ServiceCall) -> None:
 
 async def async_turn_on(hass: HomeAssistant, call: ServiceCall) -> None:
     device_mac = call.data.get("device_mac")
-    api = SolemAPI(hass, device_mac, bluetooth_timeout=_get_timeout(call))
+    api = _get_api(hass, device_mac, _get_timeout(call), _get_scan_timeout(call))
     try:
         await api.turn_on()
     except APIConnectionError as exc:
@@ -68,7 +124,7 @@ async def async_sprinkle_station_x_for_y_minutes(hass: HomeAssistant, call: Serv
     device_mac = call.data.get("device_mac")
     station = int(call.data.get("station", 1))
     minutes = int(call.data.get("minutes", 1))
-    api = SolemAPI(hass, device_mac, bluetooth_timeout=_get_timeout(call))
+    api = _get_api(hass, device_mac, _get_timeout(call), _get_scan_timeout(call))
     try:
         await api.sprinkle_station_x_for_y_minutes(station, minutes)
     except APIConnectionError as exc:
@@ -78,7 +134,7 @@ async def async_sprinkle_station_x_for_y_minutes(hass: HomeAssistant, call: Serv
 async def async_sprinkle_all_stations_for_y_minutes(hass: HomeAssistant, call: ServiceCall) -> None:
     device_mac = call.data.get("device_mac")
     minutes = int(call.data.get("minutes", 1))
-    api = SolemAPI(hass, device_mac, bluetooth_timeout=_get_timeout(call))
+    api = _get_api(hass, device_mac, _get_timeout(call), _get_scan_timeout(call))
     try:
         await api.sprinkle_all_stations_for_y_minutes(minutes)
     except APIConnectionError as exc:
@@ -88,7 +144,7 @@ async def async_sprinkle_all_stations_for_y_minutes(hass: HomeAssistant, call: S
 async def async_run_program_x(hass: HomeAssistant, call: ServiceCall) -> None:
     device_mac = call.data.get("device_mac")
     program = int(call.data.get("program", 1))
-    api = SolemAPI(hass, device_mac, bluetooth_timeout=_get_timeout(call))
+    api = _get_api(hass, device_mac, _get_timeout(call), _get_scan_timeout(call))
     try:
         await api.run_program_x(program)
     except APIConnectionError as exc:
@@ -97,43 +153,45 @@ async def async_run_program_x(hass: HomeAssistant, call: ServiceCall) -> None:
 
 async def async_stop_manual_sprinkle(hass: HomeAssistant, call: ServiceCall) -> None:
     device_mac = call.data.get("device_mac")
-    api = SolemAPI(hass, device_mac, bluetooth_timeout=_get_timeout(call))
+    api = _get_api(hass, device_mac, _get_timeout(call), _get_scan_timeout(call))
     try:
         await api.stop_manual_sprinkle()
     except APIConnectionError as exc:
         raise HomeAssistantError(str(exc)) from exc
 
 
-def async_setup_services(hass: HomeAssistant) -> None:
-    async def _handle_list_characteristics(call: ServiceCall) -> None:
-        await async_list_characteristics(hass, call)
+async def _async_close_clients(hass: HomeAssistant, event: Event) -> None:
+    """Disconnect all shared BLE connections on Home Assistant shutdown."""
+    clients = hass.data[DOMAIN]["clients"]
+    await asyncio.gather(*(entry.async_close() for entry in clients.values()))
+    clients.clear()
 
-    async def _handle_turn_off_permanent(call: ServiceCall) -> None:
-        await async_turn_off_permanent(hass, call)
 
-    async def _handle_turn_off_x_days(call: ServiceCall) -> None:
-        await async_turn_off_x_days(hass, call)
+# Service name -> handler; each handler is registered with `hass` bound.
+_HANDLERS = {
+    "list_characteristics": async_list_characteristics,
+    "turn_off_permanent": async_turn_off_permanent,
+    "turn_off_x_days": async_turn_off_x_days,
+    "turn_on": async_turn_on,
+    "sprinkle_station_x_for_y_minutes": async_sprinkle_station_x_for_y_minutes,
+    "sprinkle_all_stations_for_y_minutes": async_sprinkle_all_stations_for_y_minutes,
+    "run_program_x": async_run_program_x,
+    "stop_manual_sprinkle": async_stop_manual_sprinkle,
+}
 
-    async def _handle_turn_on(call: ServiceCall) -> None:
-        await async_turn_on(hass, call)
 
-    async def _handle_sprinkle_station(call: ServiceCall) -> None:
-        await async_sprinkle_station_x_for_y_minutes(hass, call)
-
-    async def _handle_sprinkle_all(call: ServiceCall) -> None:
-        await async_sprinkle_all_stations_for_y_minutes(hass, call)
-
-    async def _handle_run_program(call: ServiceCall) -> None:
-        await async_run_program_x(hass, call)
-
-    async def _handle_stop_manual(call: ServiceCall) -> None:
-        await async_stop_manual_sprinkle(hass, call)
-
-    hass.services.async_register(DOMAIN, "list_characteristics", _handle_list_characteristics)
-    hass.services.async_register(DOMAIN, "turn_off_permanent", _handle_turn_off_permanent)
-    hass.services.async_register(DOMAIN, "turn_off_x_days", _handle_turn_off_x_days)
-    hass.services.async_register(DOMAIN, "turn_on", _handle_turn_on)
-    hass.services.async_register(DOMAIN, "sprinkle_station_x_for_y_minutes", _handle_sprinkle_station)
-    hass.services.async_register(DOMAIN, "sprinkle_all_stations_for_y_minutes", _handle_sprinkle_all)
-    hass.services.async_register(DOMAIN, "run_program_x", _handle_run_program)
-    hass.services.async_register(DOMAIN, "stop_manual_sprinkle", _handle_stop_manual)
+def async_setup_services(hass: HomeAssistant) -> None:
+    data = hass.data.setdefault(DOMAIN, {})
+    # Shared BLE connections, keyed by lowercased MAC address
+    data["clients"] = {}
+    # Per-device connect locks, keyed by lowercased MAC address
+    data["locks"] = defaultdict(asyncio.Lock)
+    # SolemAPI instances, keyed by (normalized MAC, bluetooth timeout, scan timeout)
+    data["apis"] = {}
+
+    for name, handler in _HANDLERS.items():
+        hass.services.async_register(DOMAIN, name, functools.partial(handler, hass))
+
+    hass.bus.async_listen_once(
+        EVENT_HOMEASSISTANT_STOP, functools.partial(_async_close_clients, hass)
+    )
@@ -0,0 +1,369 @@
+"""Tests for the shared BLE connection handling in SolemAPI."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+from bleak.exc import BleakDBusError, BleakError
+
+from custom_components.solem_toolkit import api as api_module
+from custom_components.solem_toolkit.api import APIConnectionError, SolemAPI
+
+MAC = "00:11:22:33:44:55"
+TURN_ON = bytes.fromhex("310512ff00ffff")
+COMMIT = b"\x3b\x00"
+
+
+def _invalid_length() -> BleakDBusError:
+    return BleakDBusError("org.bluez.Error.InvalidValueLength", [])
+
+
+class FakeHass:
+    """Just enough of HomeAssistant for SolemAPI."""
+
+    def __init__(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.data: dict = {}
+        self.tasks: list[asyncio.Task] = []
+
+    def async_create_background_task(self, target, name):
+        task = self.loop.create_task(target, name=name)
+        self.tasks.append(task)
+        return task
+
+    async def async_block_till_done(self) -> None:
+        while self.tasks:
+            await self.tasks.pop()
+
+
+class FakeServices:
+    def __init__(self, properties: list[str] | None) -> None:
+        self.properties = properties
+
+    def get_characteristic(self, uuid):
+        if self.properties is None:
+            return None
+        return SimpleNamespace(properties=self.properties)
+
+
+class FakeClient:
+    """BleakClient stand-in recording writes and disconnects.
+
+    `errors` are raised, in order, by the next write attempts.
+    """
+
+    def __init__(
+        self,
+        fail_writes: bool = False,
+        properties: list[str] | None = None,
+        errors: tuple[Exception, ...] = (),
+    ) -> None:
+        self.is_connected = True
+        self.services = FakeServices(properties)
+        self.fail_writes = fail_writes
+        self.errors = list(errors)
+        self.attempts: list[bytes] = []
+        self.writes: list[bytes] = []
+        self.disconnects = 0
+
+    async def write_gatt_char(self, uuid, data, response=False) -> None:
+        self.attempts.append(bytes(data))
+        if self.fail_writes:
+            raise BleakError("write failed")
+        if self.errors:
+            raise self.errors.pop(0)
+        self.writes.append(bytes(data))
+
+    async def disconnect(self) -> None:
+        self.disconnects += 1
+        self.is_connected = False
+
+
+def _make_api(hass: FakeHass, fakes: list[FakeClient], **kwargs) -> SolemAPI:
+    """Build a SolemAPI (shared registry by default) whose connects hand out `fakes`."""
+    kwargs.setdefault("clients", {})
+    api = SolemAPI(hass, MAC, **kwargs)
+    pending = iter(fakes)
+    api.connects = 0
+
+    async def _connect_client(disconnected_callback=None):
+        api.connects += 1
+        return next(pending)
+
+    api._connect_client = _connect_client
+    return api
+
+
+def test_idle_connection_is_closed(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(api_module, "CLIENT_IDLE_TIMEOUT", 0.01)
+
+    async def _run() -> None:
+        hass = FakeHass()
+        client = FakeClient()
+        api = _make_api(hass, [client])
+
+        await api.turn_on()
+        entry = api._persistent_client()
+        assert entry.client is client
+        assert client.disconnects == 0
+
+        await asyncio.sleep(0.05)
+        await hass.async_block_till_done()
+        assert entry.client is None
+        assert client.disconnects == 1
+
+    asyncio.run(_run())
+
+
+def test_connection_is_reused_between_commands() -> None:
+    async def _run() -> None:
+        hass = FakeHass()
+        client = FakeClient()
+        api = _make_api(hass, [client])
+
+        await api.turn_on()
+        await api.stop_manual_sprinkle()
+        assert api.connects == 1
+        assert len(client.writes) == 4
+        await api._persistent_client().async_close()
+
+    asyncio.run(_run())
+
+
+def test_reconnects_after_device_disconnect() -> None:
+    async def _run() -> None:
+        hass = FakeHass()
+        first, second = FakeClient(), FakeClient()
+        api = _make_api(hass, [first, second])
+
+        await api.turn_on()
+        entry = api._persistent_client()
+        first.is_connected = False
+        entry.on_disconnect(first)
+        assert entry.client is None
+
+        await api.turn_on()
+        assert api.connects == 2
+        assert entry.client is second
+        assert second.writes
+        await entry.async_close()
+
+    asyncio.run(_run())
+
+
+def test_failed_write_drops_shared_connection() -> None:
+    async def _run() -> None:
+        hass = FakeHass()
+        broken, healthy = FakeClient(fail_writes=True), FakeClient()
+        api = _make_api(hass, [broken, healthy])
+
+        with pytest.raises(APIConnectionError):
+            await api.turn_on()
+        await hass.async_block_till_done()
+        entry = api._persistent_client()
+        assert entry.client is None
+        assert broken.disconnects == 1
+
+        await api.turn_on()
+        assert entry.client is healthy
+        await entry.async_close()
+
+    asyncio.run(_run())
+
+
+def test_reconnect_waits_for_pending_disconnect(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(api_module, "CLIENT_IDLE_TIMEOUT", 0.01)
+
+    async def _run() -> None:
+        hass = FakeHass()
+        events: list[str] = []
+
+        class SlowClient(FakeClient):
+            async def disconnect(self) -> None:
+                await asyncio.sleep(0.05)
+                await super().disconnect()
+                events.append("disconnected")
+
+        first, second = SlowClient(), FakeClient()
+        api = _make_api(hass, [first, second])
+        connect = api._connect_client
+
+        async def _recording_connect(disconnected_callback=None):
+            events.append("connect")
+            return await connect(disconnected_callback)
+
+        api._connect_client = _recording_connect
+
+        await api.turn_on()
+        # Let the idle timer fire and start the (slow) disconnect, then reconnect.
+        await asyncio.sleep(0.02)
+        await api.turn_on()
+        assert events == ["connect", "disconnected", "connect"]
+        await api._persistent_client().async_close()
+
+    asyncio.run(_run())
+
+
+def test_parallel_one_shot_sessions_do_not_overlap() -> None:
+    async def _run() -> None:
+        hass = FakeHass()
+        events: list[str] = []
+
+        class RecordingClient(FakeClient):
+            def __init__(self, name: str) -> None:
+                super().__init__()
+                self.name = name
+
+            async def write_gatt_char(self, uuid, data, response=False) -> None:
+                await asyncio.sleep(0.01)
+                await super().write_gatt_char(uuid, data, response)
+                events.append(f"write{self.name}")
+
+            async def disconnect(self) -> None:
+                await asyncio.sleep(0.01)
+                await super().disconnect()
+                events.append(f"disc{self.name}")
+
+        first, second = RecordingClient("1"), RecordingClient("2")
+        # No shared registry: each call connects and disconnects on its own.
+        api = _make_api(
+            hass, [first, second], clients=None, locks=defaultdict(asyncio.Lock)
+        )
+        connect = api._connect_client
+
+        async def _recording_connect(disconnected_callback=None):
+            client = await connect(disconnected_callback)
+            events.append(f"conn{client.name}")
+            return client
+
+        api._connect_client = _recording_connect
+
+        await asyncio.gather(api.turn_on(), api.turn_on())
+        await hass.async_block_till_done()
+        assert events == [
+            "conn1", "write1", "write1", "disc1", "conn2", "write2", "write2", "disc2"
+        ]
+
+    asyncio.run(_run())
+
+
+@pytest.mark.parametrize(
+    ("method", "args", "command"),
+    [
+        ("turn_on", (), "310512ff00ffff"),
+        ("turn_off_permanent", (), "3105c000000000"),
+        ("turn_off_x_days", (7,), "3105150007ffff"),
+        ("turn_off_x_days", (-3,), "3105150000ffff"),
+        ("sprinkle_station_x_for_y_minutes", (3, 10), "31052203000affff"),
+        ("sprinkle_station_x_for_y_minutes", (20, 500), "3105221000f0ffff"),
+        ("sprinkle_station_x_for_y_minutes", (0, 0), "310522010001ffff"),
+        ("sprinkle_all_stations_for_y_minutes", (15,), "310523000fffff"),
+        ("sprinkle_all_stations_for_y_minutes", (999,), "31052300f0ffff"),
+        ("run_program_x", (2,), "3105210200ffff"),
+        ("run_program_x", (9,), "3105210300ffff"),
+        ("stop_manual_sprinkle", (), "3105240000ffff"),
+    ],
+)
+@pytest.mark.parametrize("coalesce", [False, True])
+def test_command_frames(method: str, args: tuple, command: str, coalesce: bool) -> None:
+    async def _run() -> None:
+        client = FakeClient()
+        api = _make_api(FakeHass(), [client], coalesce_commit=coalesce)
+
+        await getattr(api, method)(*args)
+        expected = bytes.fromhex(command)
+        if coalesce:
+            assert client.writes == [expected + b"\x3b\x00"]
+        else:
+            assert client.writes == [expected, b"\x3b\x00"]
+        await api._persistent_client().async_close()
+
+    asyncio.run(_run())
+
+
+@pytest.mark.parametrize(
+    ("properties", "expected"),
+    [
+        (["write"], (True, True)),
+        (["write-without-response"], (False, False)),
+        (["write", "write-without-response"], (True, False)),
+        (None, (False, False)),
+    ],
+)
+def test_write_modes(properties: list[str] | None, expected: tuple[bool, bool]) -> None:
+    async def _run() -> None:
+        api = SolemAPI(FakeHass(), MAC)
+        assert api._write_modes(FakeClient(properties=properties)) == expected
+
+    asyncio.run(_run())
+
+
+def test_coalesced_write_falls_back_when_rejected() -> None:
+    async def _run() -> None:
+        client = FakeClient(errors=(_invalid_length(),))
+        api = _make_api(FakeHass(), [client], coalesce_commit=True)
+
+        await api.turn_on()
+        assert client.attempts == [TURN_ON + COMMIT, TURN_ON, COMMIT]
+        assert client.writes == [TURN_ON, COMMIT]
+        assert api._coalesce_commit is False
+        await api._persistent_client().async_close()
+
+    asyncio.run(_run())
+
+
+def test_coalesced_write_kept_after_transient_error() -> None:
+    async def _run() -> None:
+        client = FakeClient(fail_writes=True)
+        api = _make_api(FakeHass(), [client], coalesce_commit=True)
+
+        with pytest.raises(APIConnectionError):
+            await api.turn_on()
+        # Only the coalesced frame was tried; no split resend of the command.
+        assert set(client.attempts) == {TURN_ON + COMMIT}
+        assert api._coalesce_commit is True
+
+    asyncio.run(_run())
+
+
+def test_transient_write_error_is_retried() -> None:
+    async def _run() -> None:
+        client = FakeClient(errors=(BleakError("busy"),))
+        api = _make_api(FakeHass(), [client])
+
+        await api.turn_on()
+        assert client.attempts == [TURN_ON, TURN_ON, COMMIT]
+        assert client.writes == [TURN_ON, COMMIT]
+        await api._persistent_client().async_close()
+
+    asyncio.run(_run())
+
+
+def test_unsupported_write_is_not_retried() -> None:
+    async def _run() -> None:
+        error = _invalid_length()
+        client = FakeClient(errors=(error,))
+        api = _make_api(FakeHass(), [client])
+
+        with pytest.raises(APIConnectionError) as exc_info:
+            await api.turn_on()
+        assert client.attempts == [TURN_ON]
+        assert exc_info.value.__cause__ is error
+
+    asyncio.run(_run())
+
+
+def test_exhausted_retries_raise_api_error() -> None:
+    async def _run() -> None:
+        client = FakeClient(fail_writes=True)
+        api = _make_api(FakeHass(), [client])
+
+        with pytest.raises(APIConnectionError) as exc_info:
+            await api.turn_on()
+        assert client.attempts == [TURN_ON] * 3
+        assert type(exc_info.value.__cause__) is BleakError
+
+    asyncio.run(_run())
@@ -0,0 +1,25 @@
+"""Tests for service-call argument handling."""
+
+from __future__ import annotations
+
+import pytest
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.solem_toolkit.services import _normalize_mac
+
+
+@pytest.mark.parametrize(
+    "raw",
+    ["00:11:22:aa:bb:cc", " 00-11-22-AA-BB-CC ", "00:11:22:AA:BB:CC"],
+)
+def test_normalize_mac(raw: str) -> None:
+    assert _normalize_mac(raw) == "00:11:22:AA:BB:CC"
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [None, "", "garbage", "00:11:22:33:44", "00:11:22:33:44:55:66", "00:11:22:33:44:GG"],
+)
+def test_normalize_mac_rejects_invalid(raw) -> None:
+    with pytest.raises(HomeAssistantError):
+        _normalize_mac(raw)